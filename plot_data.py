@@ -4,11 +4,19 @@ from datetime import datetime, timedelta
 from dash import Dash, dcc, html, Input, Output
 import plotly.graph_objs as go
 
+from plot_helpers import (
+    downcast_floats, time_order, prefix_sums, window_stats, true_times,
+    downsample_minmax
+)
+
 # ------------------------------------------------------------
 # 1. LOAD RAW DATA
 # ------------------------------------------------------------
 raw_path = "Raw_Data.csv"   # <-- adapt if needed
-df = pd.read_csv(raw_path)
+try:
+    df = pd.read_csv(raw_path, engine="pyarrow")   # multithreaded parser
+except ImportError:
+    df = pd.read_csv(raw_path)
 
 # Column names should contain something like:
 # Time (s), Gyroscope x (rad/s), Gyroscope y (rad/s), Gyroscope z (rad/s), Absolute (rad/s)
@@ -16,6 +24,14 @@ df = pd.read_csv(raw_path)
 # Normalize column names
 df.columns = [c.strip() for c in df.columns]
 
+# Sensor channels fit in float32; time columns keep float64 precision
+df = downcast_floats(df)
+
+# Slider windows are binary-searched, so keep rows sorted by "Time (s)"
+order = time_order(df["Time (s)"].to_numpy())
+if order is not None:
+    df = df.iloc[order].reset_index(drop=True)
+
 # ------------------------------------------------------------
 # 2. META DATA (from user text)
 # ------------------------------------------------------------
@@ -30,10 +46,14 @@ pause_dt = datetime.utcfromtimestamp(pause_system_time)
 # ------------------------------------------------------------
 # 3. BUILD TRUE TIMESTAMPS
 # ------------------------------------------------------------
-df["true_time"] = df["Time (s)"].apply(lambda x: start_dt + timedelta(seconds=float(x)))
+# Only the plotted points get timestamps, built per callback
+start_ns = np.datetime64(start_dt, "ns")
+
+# "Time (s)" is sorted, so slider windows are found by binary search
+t_arr = df["Time (s)"].to_numpy()
 
 # Verification check
-computed_end_time = df["true_time"].iloc[-1]
+computed_end_time = start_dt + timedelta(seconds=float(t_arr[-1]))
 print("Start time:", start_dt)
 print("Computed last time:", computed_end_time)
 print("Pause time:", pause_dt)
@@ -54,6 +74,13 @@ stats = df[gyro_cols].agg(['mean', 'std'])
 print("\n=== Stats ===")
 print(stats)
 
+
+# Prefix sums turn every slider window's mean/std into two subtractions
+gyro_sums = prefix_sums(df[gyro_cols].to_numpy())
+
+# Plain NumPy arrays for the slider callback, no pandas on the hot path
+gyro_arr = df[gyro_cols].to_numpy(np.float32)
+
 # ------------------------------------------------------------
 # 5. DASH APP
 # ------------------------------------------------------------
@@ -82,30 +109,53 @@ app.layout = html.Div([
 ])
 
 
+# Slider read-out is pure formatting, so render it in the browser
+app.clientside_callback(
+    """
+    function(trim_range) {
+        const [tmin, tmax] = trim_range;
+        return `Start: ${tmin.toFixed(3)} s   |   End: ${tmax.toFixed(3)} s   |   Window: ${(tmax - tmin).toFixed(3)} s`;
+    }
+    """,
+    Output("slider-values", "children"),
+    Input("trim-slider", "value")
+)
+
+
 @app.callback(
-    [Output("gyro-plot", "figure"), Output("stats-output", "children"), Output("slider-values", "children")],
+    [Output("gyro-plot", "figure"), Output("stats-output", "children")],
     [Input("trim-slider", "value")]
 )
 def update_plot(trim_range):
 
     tmin, tmax = trim_range
-    dff = df[(df["Time (s)"] >= tmin) & (df["Time (s)"] <= tmax)]
+    lo = np.searchsorted(t_arr, tmin, side="left")
+    hi = np.searchsorted(t_arr, tmax, side="right")
+    t_window = t_arr[lo:hi]
 
     fig = go.Figure()
 
+    # Window stats, computed once and reused for lines and the stats panel
+    means, stds = window_stats(gyro_sums, lo, hi)
+
+    # Horizontal reference lines only need the window's two end points
+    x_ends = true_times(start_ns, t_window[[0, -1]]) if hi > lo else []
+
     # Add gyro traces
-    for col in gyro_cols:
-        fig.add_trace(go.Scatter(
-            x=dff["true_time"],
-            y=dff[col],
+    for j, col in enumerate(gyro_cols):
+        y_window = gyro_arr[lo:hi, j]
+        idx = downsample_minmax(y_window)
+        fig.add_trace(go.Scattergl(
+            x=true_times(start_ns, t_window[idx]),
+            y=y_window[idx],
             mode='lines',
             name=col
         ))
 
         # Add mean line
         fig.add_trace(go.Scatter(
-            x=dff["true_time"],
-            y=[dff[col].mean()] * len(dff),
+            x=x_ends,
+            y=[means[j]] * len(x_ends),
             mode='lines',
             name=f"{col} mean",
             line=dict(dash='dash'),
@@ -114,8 +164,8 @@ def update_plot(trim_range):
 
         # Add STD band (±1σ)
         fig.add_trace(go.Scatter(
-            x=dff["true_time"],
-            y=[dff[col].mean() + dff[col].std()] * len(dff),
+            x=x_ends,
+            y=[means[j] + stds[j]] * len(x_ends),
             mode='lines',
             name=f"{col} +1σ",
             line=dict(dash='dot'),
@@ -123,8 +173,8 @@ def update_plot(trim_range):
         ))
 
         fig.add_trace(go.Scatter(
-            x=dff["true_time"],
-            y=[dff[col].mean() - dff[col].std()] * len(dff),
+            x=x_ends,
+            y=[means[j] - stds[j]] * len(x_ends),
             mode='lines',
             name=f"{col} -1σ",
             line=dict(dash='dot'),
@@ -139,9 +189,8 @@ def update_plot(trim_range):
     )
 
     # Updated stats
-    stats_text = dff[gyro_cols].agg(['mean', 'std']).to_string()
-    slider_text = f"Start: {tmin:.3f} s   |   End: {tmax:.3f} s   |   Window: {tmax - tmin:.3f} s"
-    return fig, stats_text, slider_text
+    stats_text = pd.DataFrame([means, stds], index=["mean", "std"], columns=gyro_cols).to_string()
+    return fig, stats_text
 
 
 if __name__ == "__main__":
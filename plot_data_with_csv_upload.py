@@ -1,25 +1,126 @@
 import base64
 import io
+import uuid
+from collections import OrderedDict
 import pandas as pd
 import numpy as np
-from datetime import datetime, timedelta
-from dash import Dash, dcc, html, Input, Output, State
+from datetime import datetime
+from dash import Dash, dcc, html, Input, Output, State, no_update
 import plotly.graph_objs as go
 
+from plot_helpers import (
+    downcast_floats, time_order, prefix_sums, window_stats, true_times,
+    downsample_minmax
+)
+
+try:
+    import pyarrow as pa
+    from pyarrow import csv as pacsv
+except ImportError:     # pandas fallback below
+    pa = None
+
+gyro_cols = [
+    'Gyroscope x (rad/s)',
+    'Gyroscope y (rad/s)',
+    'Gyroscope z (rad/s)',
+    'Absolute (rad/s)'
+]
+
 # -------------------------------------------------------------------
 # Helper: decode uploaded file
 # -------------------------------------------------------------------
-def parse_contents(contents):
+def parse_contents(contents, usecols=None):
     content_type, content_string = contents.split(',')
     decoded_bytes = base64.b64decode(content_string)      # bytes
-    decoded_str = decoded_bytes.decode('utf-8', errors='ignore')   # string
 
-    # Auto-detect separator from first line
-    first_line = decoded_str.split("\n")[0]
-    sep = ";" if ";" in first_line else ","
+    # Auto-detect separator from first line (no full-file decode)
+    first_line = decoded_bytes[:4096].split(b"\n", 1)[0]
+    sep = ";" if b";" in first_line else ","
+
+    # Header names are matched after cleaning (stray spaces, trailing ';')
+    def clean(name):
+        return name.strip().strip(";")
+
+    def wanted(name):
+        return usecols is None or clean(name) in usecols
+
+    # Parse straight from the byte buffer with Arrow's multithreaded reader
+    df = None
+    if pa is not None:
+        try:
+            table = pacsv.read_csv(
+                pa.BufferReader(decoded_bytes),
+                read_options=pacsv.ReadOptions(use_threads=True, block_size=1 << 20),
+                parse_options=pacsv.ParseOptions(delimiter=sep)
+            )
+            # Invalid UTF-8 comes back as binary columns or undecodable /
+            # U+FFFD header names; let pandas drop those bytes instead
+            if not any(
+                pa.types.is_binary(f.type) or "\ufffd" in f.name
+                for f in table.schema
+            ):
+                table = table.select([n for n in table.column_names if wanted(n)])
+                df = downcast_floats(table.to_pandas())
+        except (pa.ArrowInvalid, UnicodeDecodeError):
+            pass
+
+    # Fallback: one pandas read (the C parser already tokenizes in chunks),
+    # keeping only the requested columns
+    if df is None:
+        df = downcast_floats(pd.read_csv(
+            io.BytesIO(decoded_bytes), sep=sep, encoding_errors="ignore",
+            skipinitialspace=True, usecols=wanted
+        ))
+
+    # Clean header names once here
+    df.columns = [clean(c) for c in df.columns]
+    return df
 
-    # Pass string to StringIO
-    return pd.read_csv(io.StringIO(decoded_str), sep=sep)
+# -------------------------------------------------------------------
+# Helper: parse RAW upload into the arrays the slider callback needs
+# -------------------------------------------------------------------
+def load_raw(raw_contents, start_system_time):
+    df_raw = parse_contents(raw_contents, usecols=["Time (s)"] + gyro_cols)
+    if "Time (s)" not in df_raw.columns:
+        raise KeyError("Time (s)")
+
+    # Keep plain NumPy arrays only: the slider callback never touches pandas
+    cols = [c for c in gyro_cols if c in df_raw.columns]
+    t = df_raw["Time (s)"].to_numpy()
+    gyro = df_raw[cols].to_numpy(np.float32)   # float32 halves the plotted payload
+
+    # Out-of-order rows would break the searchsorted slices: sort them once
+    order = time_order(t)
+    if order is not None:
+        t, gyro = t[order], gyro[order]
+    return {
+        "t": t,
+        "t_max": float(df_raw["Time (s)"].max()),
+        "start": np.datetime64(datetime.fromtimestamp(start_system_time), "ns"),
+        "gyro": gyro,
+        "cols": cols,
+        "sums": prefix_sums(gyro)
+    }
+
+# -------------------------------------------------------------------
+# Prepared uploads stay server-side; dcc.Store only carries their key
+# -------------------------------------------------------------------
+PREPARED_CACHE_SIZE = 4
+_prepared = OrderedDict()
+
+def store_prepared(key, raw):
+    _prepared[key] = raw
+    _prepared.move_to_end(key)
+    while len(_prepared) > PREPARED_CACHE_SIZE:
+        _prepared.popitem(last=False)
+
+# -------------------------------------------------------------------
+# Helper: placeholder figure while there is no data to plot
+# -------------------------------------------------------------------
+def waiting_figure(title="Upload Both CSV Files To Begin"):
+    fig = go.Figure()
+    fig.update_layout(title=title)
+    return fig
 
 # -------------------------------------------------------------------
 # DASH APP
@@ -53,7 +154,10 @@ app.layout = html.Div([
 
     html.Hr(),
 
-    html.Div(id="file-status", style={"font-weight": "bold", "color": "#333"}),
+    html.Div(
+        "Please upload BOTH raw and meta CSV files.",
+        id="file-status", style={"font-weight": "bold", "color": "#333"}
+    ),
 
     html.H4("Selected Time Range (seconds):"),
     html.Div(id="slider-values", style={"margin-bottom": "20px"}),
@@ -68,145 +172,187 @@ app.layout = html.Div([
         marks=None,
     ),
 
-    dcc.Graph(id='gyro-plot'),
+    dcc.Store(id="prepared"),
+
+    dcc.Graph(id='gyro-plot', figure=waiting_figure()),
 
     html.H3("Statistics"),
-    html.Pre(id="stats-output")
+    html.Pre("No data loaded.", id="stats-output")
 ])
 
 
 # -------------------------------------------------------------------
-# CALLBACK: Process CSV files and update plot
+# CLIENTSIDE: slider read-out is pure formatting, render it in the browser
+# -------------------------------------------------------------------
+app.clientside_callback(
+    """
+    function(trim_range, prepared) {
+        if (!prepared || !prepared.key) {
+            return "";
+        }
+        const [tmin, tmax] = trim_range;
+        return `Start: ${tmin.toFixed(3)} s   |   End: ${tmax.toFixed(3)} s   |   Window: ${(tmax - tmin).toFixed(3)} s`;
+    }
+    """,
+    Output("slider-values", "children"),
+    Input("trim-slider", "value"),
+    Input("prepared", "data")
+)
+
+
+# -------------------------------------------------------------------
+# CALLBACK: Process CSV files once per upload
 # -------------------------------------------------------------------
 @app.callback(
     [
-        Output("gyro-plot", "figure"),
-        Output("stats-output", "children"),
-        Output("slider-values", "children"),
+        Output("prepared", "data"),
         Output("trim-slider", "min"),
         Output("trim-slider", "max"),
         Output("trim-slider", "value"),
         Output("file-status", "children")
     ],
     [
-        Input("trim-slider", "value"),
         Input("upload-raw", "contents"),
         Input("upload-meta", "contents")
     ],
     [
         State("upload-raw", "filename"),
-        State("upload-meta", "filename")
-    ]
+        State("upload-meta", "filename"),
+        State("trim-slider", "value")
+    ],
+    prevent_initial_call=True
 )
-def update_all(trim_range, raw_contents, meta_contents, raw_name, meta_name):
-    print("Callback triggered, trim_range:", trim_range)
+def handle_uploads(raw_contents, meta_contents, raw_name, meta_name, trim_range):
     # -------------------------------
-    # No files uploaded yet
+    # Only one file uploaded so far: leave store and slider untouched
     # -------------------------------
     if raw_contents is None or meta_contents is None:
-        fig = go.Figure()
-        fig.update_layout(title="Upload Both CSV Files To Begin")
         return (
-            fig, "No data loaded.", "", 0, 1, [0, 1],
+            no_update, no_update, no_update, no_update,
             "Please upload BOTH raw and meta CSV files."
         )
 
     # -------------------------------
-    # Parse files
+    # Parse META file
     # -------------------------------
     try:
-        df_raw = parse_contents(raw_contents)
         df_meta = parse_contents(meta_contents)
     except Exception as e:
-        fig = go.Figure()
         return (
-            fig,
-            "Error reading files.",
-            "",
+            {"error": "Error reading files."},
             0, 1, [0, 1],
             f"Error: {str(e)}"
         )
 
-    # Normalize raw column names
-    df_raw.columns = [c.strip() for c in df_raw.columns]
-
     # ------------------------------------
     # Extract metadata START & PAUSE times
     # ------------------------------------
-    df_meta.columns = [c.strip(";") for c in df_meta.columns]
     try:
-        start_system_time = float(df_meta.iloc[0]["system time"])
-        pause_system_time = float(df_meta.iloc[1]["system time"])
+        system_times = df_meta["system time"].to_numpy(np.float64)
+        if len(system_times) < 2:
+            raise ValueError("expected START and PAUSE rows")
+        start_system_time = float(system_times[0])
     except Exception as e:
-        fig = go.Figure()
         return (
-            fig,
-            "Invalid META file format.",
-            "",
+            {"error": "Invalid META file format."},
             0, 1, [0, 1],
             f"Meta file error: {e}"
         )
 
-    # Convert UNIX → datetime
-    start_dt = datetime.fromtimestamp(start_system_time)
-    pause_dt = datetime.fromtimestamp(pause_system_time)
-
     # ------------------------------------
-    # Build true timestamps
+    # Parse RAW file
     # ------------------------------------
-    if "Time (s)" not in df_raw.columns:
-        fig = go.Figure()
+    try:
+        raw = load_raw(raw_contents, start_system_time)
+    except KeyError:
         return (
-            fig,
-            "Missing 'Time (s)' in raw data.",
-            "",
+            {"error": "Missing 'Time (s)' in raw data."},
             0, 1, [0, 1],
             "RAW file missing required column."
         )
+    except Exception as e:
+        return (
+            {"error": "Error reading files."},
+            0, 1, [0, 1],
+            f"Error: {str(e)}"
+        )
 
-    df_raw["true_time"] = df_raw["Time (s)"].apply(
-        lambda x: start_dt + timedelta(seconds=float(x))
-    )
+    key = uuid.uuid4().hex
+    store_prepared(key, raw)
 
     # ------------------------------------
     # Slider bounds
     # ------------------------------------
     t_min = 0
-    t_max = float(df_raw["Time (s)"].max())
+    t_max = raw["t_max"]
 
     if trim_range is None:
         trim_range = [0, t_max]
 
     tmin, tmax = trim_range
-    print("Before bounds check tmin:", tmin, "tmax:", tmax, "trim_range:", trim_range)
     # Ensure slider stays in range
     tmin = max(0, tmin)
     tmax = min(t_max, tmax)
 
+    status = f"Loaded RAW: {raw_name}   |   META: {meta_name}"
+    return {"key": key}, t_min, t_max, [tmin, tmax], status
+
+
+# -------------------------------------------------------------------
+# CALLBACK: Slice prepared data and update plot
+# -------------------------------------------------------------------
+@app.callback(
+    [
+        Output("gyro-plot", "figure"),
+        Output("stats-output", "children")
+    ],
+    [
+        Input("trim-slider", "value"),
+        Input("prepared", "data")
+    ],
+    prevent_initial_call=True
+)
+def update_plot(trim_range, prepared):
+    # -------------------------------
+    # Nothing prepared yet, or the upload failed
+    # -------------------------------
+    if prepared is None:     # slider moved before any upload
+        return no_update, no_update
+
+    if "error" in prepared:
+        return go.Figure(), prepared["error"]
+
+    raw = _prepared.get(prepared["key"])
+    # Evicted, server restarted, or held by another worker. dcc.Upload won't
+    # re-fire for the same file, so only a page reload recovers
+    if raw is None:
+        expired = "Uploaded data expired. Reload the page and upload both files again."
+        return waiting_figure(expired), expired
+
+    tmin, tmax = trim_range
+
     # ------------------------------------
     # Slice data for trimmed interval
     # ------------------------------------
-    dff = df_raw[(df_raw["Time (s)"] >= tmin) & (df_raw["Time (s)"] <= tmax)]
+    # "Time (s)" was sorted in load_raw: binary-search the window, slice without a mask
+    lo = np.searchsorted(raw["t"], tmin, side="left")
+    hi = np.searchsorted(raw["t"], tmax, side="right")
+    t_window = raw["t"][lo:hi]
 
     # ------------------------------------
     # Build plot
     # ------------------------------------
     fig = go.Figure()
-    gyro_cols = [
-        'Gyroscope x (rad/s)',
-        'Gyroscope y (rad/s)',
-        'Gyroscope z (rad/s)',
-        'Absolute (rad/s)'
-    ]
-
-    for col in gyro_cols:
-        if col in dff.columns:
-            fig.add_trace(go.Scatter(
-                x=dff["true_time"],
-                y=dff[col],
-                mode="lines",
-                name=col
-            ))
+
+    for j, col in enumerate(raw["cols"]):
+        y_window = raw["gyro"][lo:hi, j]
+        idx = downsample_minmax(y_window)
+        fig.add_trace(go.Scattergl(
+            x=true_times(raw["start"], t_window[idx]),
+            y=y_window[idx],
+            mode="lines",
+            name=col
+        ))
 
     fig.update_layout(
         title="Gyroscope Measurements",
@@ -218,29 +364,9 @@ def update_all(trim_range, raw_contents, meta_contents, raw_name, meta_name):
     # ------------------------------------
     # Stats
     # ------------------------------------
-    stats_text = dff[gyro_cols].agg(['mean', 'std']).to_string()
-
-    # ------------------------------------
-    # Slider text
-    # ------------------------------------
-    slider_text = (
-        f"Start: {tmin:.3f} s   |   End: {tmax:.3f} s   |   Window: {tmax - tmin:.3f} s"
-    )
-
-    # ------------------------------------
-    # Status
-    # ------------------------------------
-    status = f"Loaded RAW: {raw_name}   |   META: {meta_name}"
-    print("at the end tmin:", tmin, "tmax:", tmax, "trim_range:", trim_range, "t_min", t_min, "t_max", t_max)
-    return (
-        fig,
-        stats_text,
-        slider_text,
-        t_min,
-        t_max,
-        [tmin, tmax],
-        status
-    )
+    means, stds = window_stats(raw["sums"], lo, hi)
+    stats_text = pd.DataFrame([means, stds], index=["mean", "std"], columns=raw["cols"]).to_string()
+    return fig, stats_text
 
 if __name__ == "__main__":
     app.run(debug=True)
@@ -0,0 +1,98 @@
+import warnings
+
+import numpy as np
+
+# -------------------------------------------------------------------
+# Numeric helpers shared by plot_data.py and plot_data_with_csv_upload.py
+# -------------------------------------------------------------------
+MAX_PLOT_POINTS = 2000   # more than a plot width of pixels can show
+
+# -------------------------------------------------------------------
+# Helper: sensor channels fit in float32 (time columns keep float64)
+# -------------------------------------------------------------------
+def downcast_floats(df):
+    for c in df.columns:
+        if df[c].dtype == np.float64 and "time" not in c.lower():
+            df[c] = df[c].astype(np.float32)
+    return df
+
+# -------------------------------------------------------------------
+# Helper: slider windows are binary-searched, so rows must be time-sorted
+# -------------------------------------------------------------------
+def time_order(t):
+    """Stable argsort of t, or None when t is already non-decreasing."""
+    t = np.asarray(t)
+    if np.all(np.diff(t) >= 0):
+        return None
+    return np.argsort(t, kind="stable")
+
+# -------------------------------------------------------------------
+# Helper: O(1) windowed statistics from prefix sums
+# -------------------------------------------------------------------
+def prefix_sums(values):
+    """Shifted cumulative sums of a 2-D array, for O(1) windowed mean/std."""
+    values = np.asarray(values, dtype=np.float64)
+    valid = ~np.isnan(values)
+    with warnings.catch_warnings():     # all-NaN columns: "Mean of empty slice"
+        warnings.simplefilter("ignore", RuntimeWarning)
+        shift = np.nan_to_num(np.nanmean(values, axis=0))
+    centered = np.where(valid, values - shift, 0.0)   # shift keeps sums well-conditioned
+    zero = np.zeros((1, values.shape[1]))
+    cs = np.concatenate([zero, np.cumsum(centered, axis=0)])
+    cs2 = np.concatenate([zero, np.cumsum(centered * centered, axis=0)])
+
+    # Valid-sample counts only differ from hi - lo when there are NaNs
+    count = None
+    if not valid.all():
+        count = np.zeros(
+            (len(values) + 1, values.shape[1]), dtype=np.min_scalar_type(len(values))
+        )
+        np.cumsum(valid, axis=0, out=count[1:])
+    return shift, count, cs, cs2
+
+
+def window_stats(sums, lo, hi):
+    """Mean and sample std (ddof=1) of rows lo:hi, skipping NaN like pandas."""
+    shift, count, cs, cs2 = sums
+    n = hi - lo if count is None else count[hi].astype(np.int64) - count[lo]
+    s1 = cs[hi] - cs[lo]
+    s2 = cs2[hi] - cs2[lo]
+    with np.errstate(divide="ignore", invalid="ignore"):
+        mean = np.where(n > 0, s1 / n, np.nan)
+        var = np.where(n > 1, (s2 - s1 * mean) / (n - 1), np.nan)
+    return shift + mean, np.sqrt(np.maximum(var, 0.0))
+
+# -------------------------------------------------------------------
+# Helper: true timestamps, built only for the points actually plotted
+# -------------------------------------------------------------------
+def true_times(start, t):
+    """datetime64[ns] timestamps for offsets t (seconds) after start."""
+    offsets_ns = np.rint(np.asarray(t, dtype=np.float64) * 1e9).astype(np.int64)
+    return start + offsets_ns.astype("timedelta64[ns]")
+
+# -------------------------------------------------------------------
+# Helper: downsample traces for display
+# -------------------------------------------------------------------
+def downsample_minmax(y, n_out=MAX_PLOT_POINTS):
+    """Return sorted indices of the per-bucket min/max samples, at most n_out of them."""
+    y = np.asarray(y)
+    n = len(y)
+    if n <= n_out or n_out < 4:
+        return np.arange(n)
+
+    # Equal-width buckets (two points each, plus both ends); pad the tail
+    # with the last value so it reshapes
+    width = -(-n // ((n_out - 2) // 2))
+    n_buckets = -(-n // width)
+    padded = np.empty(n_buckets * width, dtype=y.dtype)
+    padded[:n] = y
+    padded[n:] = y[-1]
+    buckets = padded.reshape(n_buckets, width)
+
+    offsets = np.arange(n_buckets) * width
+    idx = np.concatenate((
+        [0, n - 1],
+        offsets + buckets.argmin(axis=1),
+        offsets + buckets.argmax(axis=1)
+    ))
+    return np.unique(np.minimum(idx, n - 1))